@@ -0,0 +1,189 @@
+# _semantic_cache.py
+# -*- coding: utf-8 -*-
+"""
+言い換え（"안녕하세요" / "안녕하세요!" など）にも当たる意味的な応答キャッシュ。
+- ユーザー発話を api_client.embed() でベクトル化し、保存済みベクトルとのコサイン類似度が
+  しきい値（既定 0.92、SPEAKSTUDIO_SEM_THRESHOLD で変更可）以上なら保存済み応答を返す
+- SPEAKSTUDIO_SEM_CACHE=1 のときのみ有効。NumPy 未導入・埋め込み失敗時は何もしない
+- namespace（会話モード・シナリオ等）が一致する行だけを比較対象にする
+- 永続化: ~/.cache/speakstudio/semantic.npy（float32 行列）+ semantic.jsonl（namespace と応答）。
+  保存のたびに両方を一時ファイル経由で書き直す
+- 件数の上限（既定 2000、SPEAKSTUDIO_SEM_MAX で変更可）を超えたら古い行から捨てる
+- stats(): ヒット/ミス回数
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None  # type: ignore
+
+try:
+    from api_client import embed  # type: ignore[reportAttributeAccessIssue]
+except Exception:
+    def embed(_text, model=None):
+        return None
+
+__all__ = ["lookup", "store", "stats"]
+
+_DEFAULT_THRESHOLD = 0.92
+_DEFAULT_MAX_ENTRIES = 2000
+_CACHE_DIR = Path.home() / ".cache" / "speakstudio"
+_MATRIX_PATH = _CACHE_DIR / "semantic.npy"
+_REPLIES_PATH = _CACHE_DIR / "semantic.jsonl"
+
+_LOCK = threading.Lock()
+_E: Any = None           # shape (N, dim) の正規化済み float32 行列
+_REPLIES: List[str] = []  # _E の各行に対応する応答
+_NAMESPACES: List[str] = []  # _E の各行に対応する namespace
+_NS_ROWS: Dict[str, List[int]] = {}  # namespace → _E の行番号（lookup のたびに全行を走査しない）
+_LOADED = False
+_STATS: Dict[str, int] = {"hits": 0, "misses": 0}
+
+
+def _enabled() -> bool:
+    return np is not None and os.getenv("SPEAKSTUDIO_SEM_CACHE") == "1"
+
+
+def _threshold() -> float:
+    try:
+        return float(os.getenv("SPEAKSTUDIO_SEM_THRESHOLD", _DEFAULT_THRESHOLD))
+    except ValueError:
+        return _DEFAULT_THRESHOLD
+
+
+def _max_entries() -> int:
+    try:
+        return max(1, int(os.getenv("SPEAKSTUDIO_SEM_MAX", _DEFAULT_MAX_ENTRIES)))
+    except ValueError:
+        return _DEFAULT_MAX_ENTRIES
+
+
+def _reindex() -> None:
+    """_NAMESPACES から namespace ごとの行番号を作り直す（読み込み時と古い行を捨てた時だけ）。"""
+    _NS_ROWS.clear()
+    for i, ns in enumerate(_NAMESPACES):
+        _NS_ROWS.setdefault(ns, []).append(i)
+
+
+def _evict() -> None:
+    """
+    上限を超えたら古い行（先頭側）から捨てる。
+    捨てるたびに全体を詰め直すので、上限の 1 割ぶん余計に捨てて回数を減らす。
+    """
+    global _E, _REPLIES, _NAMESPACES
+    limit = _max_entries()
+    if len(_REPLIES) <= limit:
+        return
+    keep = max(1, limit - limit // 10)
+    drop = len(_REPLIES) - keep
+    _E = _E[drop:].copy()
+    _REPLIES = _REPLIES[drop:]
+    _NAMESPACES = _NAMESPACES[drop:]
+    _reindex()
+
+
+def _load() -> None:
+    """永続化ファイルを 1 度だけ読み込む（行数が食い違えば破棄して空から始める）。"""
+    global _E, _REPLIES, _NAMESPACES, _LOADED
+    if _LOADED:
+        return
+    _LOADED = True
+    try:
+        if _MATRIX_PATH.is_file() and _REPLIES_PATH.is_file():
+            mat = np.load(_MATRIX_PATH)
+            with open(_REPLIES_PATH, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            if mat.ndim == 2 and mat.shape[0] == len(rows):
+                _E = mat.astype(np.float32, copy=False)
+                _REPLIES = [r["reply"] for r in rows]
+                _NAMESPACES = [r.get("ns", "") for r in rows]
+                _evict()  # 上限を下げて再起動した場合
+    except Exception:
+        _E, _REPLIES, _NAMESPACES = None, [], []
+    _reindex()
+
+
+def _normalize(vec: List[float]) -> Any:
+    q = np.asarray(vec, dtype=np.float32)
+    n = float(np.linalg.norm(q))
+    return q / n if n > 0 else q
+
+
+def lookup(text: str, namespace: str = "") -> Tuple[Optional[str], Any]:
+    """
+    (キャッシュ済み応答 or None, クエリベクトル or None) を返す。
+    ミス時に返るベクトルは store() にそのまま渡せる（埋め込みの再計算を避ける）。
+    """
+    if not _enabled() or not text.strip():
+        return None, None
+    vec = embed(text)
+    if vec is None:
+        return None, None
+    q = _normalize(vec)
+
+    with _LOCK:
+        _load()
+        rows = _NS_ROWS.get(namespace)
+        if _E is None or not rows or _E.shape[1] != q.shape[0]:
+            _STATS["misses"] += 1
+            return None, q
+        sims = _E[rows] @ q
+        j = int(np.argmax(sims))
+        if float(sims[j]) >= _threshold():
+            _STATS["hits"] += 1
+            return _REPLIES[rows[j]], q
+        _STATS["misses"] += 1
+    return None, q
+
+
+def store(q: Any, reply: str, namespace: str = "") -> None:
+    """lookup() が返したベクトルと応答を追加保存する。失敗しても例外は出さない。"""
+    global _E
+    if q is None or not reply or not _enabled():
+        return
+    with _LOCK:
+        _load()
+        if _E is not None and _E.shape[1] != q.shape[0]:
+            return
+        _E = q[None, :] if _E is None else np.vstack([_E, q[None, :]])
+        _NS_ROWS.setdefault(namespace, []).append(len(_REPLIES))
+        _REPLIES.append(reply)
+        _NAMESPACES.append(namespace)
+        _evict()
+        try:
+            _persist()
+        except Exception:
+            pass
+
+
+def _persist() -> None:
+    """
+    行列と応答の両ファイルを毎回まるごと書き直す（一時ファイル → os.replace）。
+    片方だけ追記する方式だと途中で失敗したときに行数が食い違い、以後ずっと読み込めなくなるため。
+    _load() で食い違いを検出して空から始めた場合も、次の保存で両ファイルが揃う。
+    """
+    _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_matrix = _MATRIX_PATH.with_name(_MATRIX_PATH.name + ".tmp")
+    tmp_replies = _REPLIES_PATH.with_name(_REPLIES_PATH.name + ".tmp")
+    with open(tmp_matrix, "wb") as f:
+        np.save(f, _E)
+    with open(tmp_replies, "w", encoding="utf-8") as f:
+        for ns, rep in zip(_NAMESPACES, _REPLIES):
+            f.write(json.dumps({"ns": ns, "reply": rep}, ensure_ascii=False) + "\n")
+    # 2 つの置き換えの間で落ちても、_load() が食い違いとして捨て、次の保存で両方が揃う
+    os.replace(tmp_replies, _REPLIES_PATH)
+    os.replace(tmp_matrix, _MATRIX_PATH)
+
+
+def stats() -> Dict[str, int]:
+    """ヒット/ミス回数と保存件数（観測用）。"""
+    with _LOCK:
+        return {**_STATS, "entries": len(_REPLIES)}
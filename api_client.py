@@ -4,11 +4,29 @@
 OpenAI Chat Completions を 1 回呼ぶラッパ。
 - utils.get_openai_api_key() / get_model_name() で安全にキーとモデル名を取得
 - 失敗時（キー未設定や SDK 未導入、呼び出し例外）は None を返し、UI 側でフォールバック
+- SPEAKSTUDIO_CACHE=1 のとき、同一 (model, messages, temperature) の応答をキャッシュ
+  （プロセス内 LRU → diskcache があれば ~/.cache/speakstudio/ にも保存）
+- 429/タイムアウト/接続断/5xx は指数バックオフ（揺らぎ付き）で再試行
+- chat_stream(): stream=True でトークンを届いた順に返す（体感待ち時間を短縮）。
+  途中で切れた場合は受信済み分を返した後に StreamInterrupted を送出する
+- achat(): chat() の非同期版（任意のイベントループから await 可）
+- chat_batch(): 複数の会話を AsyncOpenAI で並行実行
 """
 
 from __future__ import annotations
 
-from typing import Optional, List, Dict, Any, Iterable, TYPE_CHECKING, cast
+import asyncio
+import atexit
+import hashlib
+import importlib.util
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 
 from utils import get_openai_api_key, get_model_name
 
@@ -18,26 +36,263 @@ try:
 except Exception:
     OpenAI = None  # type: ignore
 
-# 型チェック時のみ詳細型を import（実行時は不要）
-if TYPE_CHECKING:
-    from openai.types.chat import ChatCompletionMessageParam  # type: ignore
+try:
+    from openai import AsyncOpenAI  # type: ignore
+except Exception:
+    AsyncOpenAI = None  # type: ignore
+
+# 再試行してよい一時的な失敗（レート制限・タイムアウト・接続断。5xx は status_code で判定）
+try:
+    from openai import APIConnectionError, APITimeoutError, RateLimitError  # type: ignore
+    _RETRYABLE_ERRORS: Tuple[type, ...] = (RateLimitError, APITimeoutError, APIConnectionError)
+except Exception:
+    _RETRYABLE_ERRORS = ()
+
+# httpx（OpenAI SDK の依存。接続プールのサイズ指定に使う）
+try:
+    import httpx  # type: ignore
+except Exception:
+    httpx = None  # type: ignore
+
+# orjson（任意。キャッシュキー用の JSON 直列化を高速化。未導入なら標準 json）
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore
+
+# diskcache（任意。未導入ならプロセス内キャッシュのみ）
+try:
+    import diskcache  # type: ignore
+except Exception:
+    diskcache = None  # type: ignore
+
+__all__ = ["StreamInterrupted", "achat", "cache_stats", "chat", "chat_batch", "chat_stream", "embed"]
+
+TEMPERATURE = 0.7
+# completions.create に毎回渡す固定パラメータ（呼び出しごとに組み立てない）
+_DEFAULT_PARAMS: Dict[str, Any] = {"temperature": TEMPERATURE}
+EMBED_MODEL = "text-embedding-3-small"
+
+# ===== 再試行（full jitter の指数バックオフ） =====
+_CHAT_MAX_ATTEMPTS = 4       # chat() / achat(): UI を待たせるので控えめ
+_CHAT_RETRY_MAX_SEC = 20.0
+_RETRY_MAX_ATTEMPTS = 6      # chat_batch()
+_RETRY_BASE_SEC = 1.0        # 1 回目の待ち上限（以後倍々で _*_MAX_SEC まで）
+_RETRY_MAX_SEC = 30.0
+_BATCH_TIMEOUT_SEC = 120.0   # chat_batch() 全体の待ち上限
+
+# ===== クライアント共有（API キーが同じ間は使い回し、HTTP 接続は常に共有） =====
+_CLIENT: Any = None
+_CLIENT_KEY: Optional[str] = None
+_CLIENT_LOCK = threading.Lock()
+_HTTP: Any = None  # 共有 httpx.Client（_CLIENT_LOCK 下で生成）
 
-__all__ = ["chat"]
+# ===== 非同期実行（常駐イベントループ + AsyncOpenAI の使い回し） =====
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+_ASYNC_CLIENT: Any = None      # _LOOP 上でのみ生成・使用する
+_ASYNC_CLIENT_KEY: Optional[str] = None
+_CLOSING_TASKS: set = set()    # 差し替えた AsyncOpenAI の close() タスク（完了まで参照を保持）
+
+# ===== 応答キャッシュ設定 =====
+_CACHE_MAXSIZE = 512
+_CACHE_EXPIRE_SEC = 3600
+_CACHE_DIR = Path.home() / ".cache" / "speakstudio"
+
+_MEM_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_CACHE_STATS: Dict[str, int] = {"hits": 0, "misses": 0}
+_CACHE_LOCK = threading.Lock()
+_DISK_CACHE: Any = None
+_DISK_CACHE_FAILED = False
+
+
+def _get_http_client() -> Any:
+    """
+    全 OpenAI クライアントで共有する httpx.Client（httpx 未導入なら None = SDK 既定）。
+    h2 が入っていれば HTTP/2 で 1 本の TCP+TLS 接続に多重化する。終了時に atexit で閉じる。
+    """
+    global _HTTP
+    if httpx is None:
+        return None
+    if _HTTP is None:
+        try:
+            _HTTP = httpx.Client(  # type: ignore[attr-defined]
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(  # type: ignore[attr-defined]
+                    max_connections=50,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=60.0,
+                ),
+                timeout=httpx.Timeout(30.0, connect=5.0),  # type: ignore[attr-defined]
+            )
+            atexit.register(_HTTP.close)
+        except Exception:
+            return None
+    return _HTTP
 
 
 def _make_client():
     """
-    OpenAI クライアントを生成。APIキー未取得 or SDK 未導入なら (None, key) を返す。
+    OpenAI クライアントを返す（同じ API キーならモジュール内で使い回す）。
+    APIキー未取得 or SDK 未導入なら (None, key) を返す。
     返り値: (client_or_none, api_key_or_none)
     """
+    global _CLIENT, _CLIENT_KEY
     api_key = get_openai_api_key()
     if not api_key or OpenAI is None:
         return None, api_key
-    try:
-        client = OpenAI(api_key=api_key)  # type: ignore[call-arg]
+
+    with _CLIENT_LOCK:
+        if _CLIENT is not None and _CLIENT_KEY == api_key:
+            return _CLIENT, api_key
+        try:
+            http_client = _get_http_client()
+            if http_client is not None:
+                client = OpenAI(api_key=api_key, http_client=http_client, max_retries=0)  # type: ignore[call-arg]
+            else:
+                client = OpenAI(api_key=api_key, max_retries=0)  # type: ignore[call-arg]
+        except Exception:
+            return None, api_key
+        _CLIENT, _CLIENT_KEY = client, api_key
         return client, api_key
+
+
+# -----------------------------
+# 応答キャッシュ
+# -----------------------------
+def _cache_enabled(temperature: float) -> bool:
+    """
+    SPEAKSTUDIO_CACHE=1 のときのみ有効。
+    temperature>0 の応答は本来ばらつくため、SPEAKSTUDIO_CACHE_ALWAYS=1 が無ければ対象外。
+    """
+    if os.getenv("SPEAKSTUDIO_CACHE") != "1":
+        return False
+    if temperature > 0 and os.getenv("SPEAKSTUDIO_CACHE_ALWAYS") != "1":
+        return False
+    return True
+
+
+def _cache_key(model: str, messages: List[Dict[str, Any]], temperature: float) -> str:
+    """
+    (model, messages, temperature) の正規化 JSON から BLAKE2b キーを作る。
+    orjson の有無で同じバイト列になるよう、json 側も区切り文字を詰めて UTF-8 のまま出す。
+    """
+    obj = {"model": model, "messages": messages, "temperature": temperature}
+    if orjson is not None:
+        payload = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)  # type: ignore[attr-defined]
+    else:
+        payload = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _get_disk_cache() -> Any:
+    """diskcache.Cache を遅延生成（未導入・作成失敗時は None）。"""
+    global _DISK_CACHE, _DISK_CACHE_FAILED
+    if diskcache is None or _DISK_CACHE_FAILED:
+        return None
+    if _DISK_CACHE is None:
+        try:
+            _DISK_CACHE = diskcache.Cache(str(_CACHE_DIR))  # type: ignore[attr-defined]
+        except Exception:
+            _DISK_CACHE_FAILED = True
+            return None
+    return _DISK_CACHE
+
+
+def _cache_get(key: str) -> Optional[str]:
+    """キャッシュを引き、ヒット/ミスを数える。"""
+    hit = _cache_lookup(key)
+    with _CACHE_LOCK:
+        _CACHE_STATS["hits" if hit is not None else "misses"] += 1
+    return hit
+
+
+def _cache_lookup(key: str) -> Optional[str]:
+    """プロセス内 LRU → ディスクの順に引く。ディスクで当たればプロセス内にも載せる。"""
+    with _CACHE_LOCK:
+        hit = _MEM_CACHE.get(key)
+        if hit is not None:
+            _MEM_CACHE.move_to_end(key)
+            return hit
+
+    dc = _get_disk_cache()
+    if dc is None:
+        return None
+    try:
+        hit = dc.get(key)
     except Exception:
-        return None, api_key
+        return None
+    if not isinstance(hit, str):
+        return None
+    _mem_put(key, hit)
+    return hit
+
+
+def _mem_put(key: str, value: str) -> None:
+    with _CACHE_LOCK:
+        _MEM_CACHE[key] = value
+        _MEM_CACHE.move_to_end(key)
+        while len(_MEM_CACHE) > _CACHE_MAXSIZE:
+            _MEM_CACHE.popitem(last=False)
+
+
+def _cache_set(key: str, value: str) -> None:
+    _mem_put(key, value)
+    dc = _get_disk_cache()
+    if dc is None:
+        return
+    try:
+        dc.set(key, value, expire=_CACHE_EXPIRE_SEC)
+    except Exception:
+        pass
+
+
+def cache_stats() -> Dict[str, int]:
+    """応答キャッシュのヒット/ミス回数とプロセス内の保持件数（観測用）。"""
+    with _CACHE_LOCK:
+        return {**_CACHE_STATS, "entries": len(_MEM_CACHE)}
+
+
+# -----------------------------
+# 再試行
+# -----------------------------
+def _is_retryable(err: BaseException) -> bool:
+    """レート制限・タイムアウト・接続断・5xx のみ再試行対象（4xx 等は即失敗）。"""
+    if _RETRYABLE_ERRORS and isinstance(err, _RETRYABLE_ERRORS):
+        return True
+    status = getattr(err, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+def _backoff_delay(attempt: int, max_sec: float = _RETRY_MAX_SEC) -> float:
+    """attempt 回目（0 始まり）の待ち秒数。0 〜 上限付き指数の一様乱数（full jitter）。"""
+    upper = min(max_sec, _RETRY_BASE_SEC * (2 ** attempt))
+    return random.uniform(0.0, upper)
+
+
+def _create_with_retry(client: Any, model: str, messages: List[Dict[str, Any]], **extra: Any) -> Any:
+    """completions.create を一時的な失敗のみ再試行して呼ぶ。最終的な失敗は例外を送出。"""
+    for attempt in range(_CHAT_MAX_ATTEMPTS):
+        try:
+            return client.chat.completions.create(  # type: ignore[reportUnknownMemberType]
+                model=model,
+                messages=messages,  # type: ignore[arg-type]
+                **_DEFAULT_PARAMS,
+                **extra,
+            )
+        except Exception as e:
+            if not _is_retryable(e) or attempt + 1 >= _CHAT_MAX_ATTEMPTS:
+                raise
+            time.sleep(_backoff_delay(attempt, _CHAT_RETRY_MAX_SEC))
+    raise RuntimeError("unreachable")
+
+
+def _has_user_content(messages: List[Dict[str, Any]]) -> bool:
+    """空白以外の中身を持つ user メッセージが 1 つでもあるか。"""
+    for m in messages:
+        if m.get("role") == "user" and str(m.get("content") or "").strip():
+            return True
+    return False
 
 
 def chat(messages: List[Dict[str, Any]], model: Optional[str] = None) -> Optional[str]:
@@ -46,21 +301,260 @@ def chat(messages: List[Dict[str, Any]], model: Optional[str] = None) -> Optiona
     - messages: [{"role": "system"|"user"|"assistant", "content": "..."}, ...]
     - model: 未指定なら utils.get_model_name() を使用
     - 例外は握りつぶし、None を返す
+    - user の発話が空（空白のみ）なら API を呼ばずに None
+    """
+    if not _has_user_content(messages):
+        return None
+    client, api_key = _make_client()
+    if client is None or not api_key:
+        return None
+
+    mdl = model or get_model_name()
+
+    key: Optional[str] = None
+    if _cache_enabled(TEMPERATURE):
+        key = _cache_key(mdl, messages, TEMPERATURE)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
+    try:
+        resp = _create_with_retry(client, mdl, messages)
+        text = (resp.choices[0].message.content or "").strip()
+    except Exception:
+        return None
+
+    if key is not None and text:
+        _cache_set(key, text)
+    return text
+
+
+class StreamInterrupted(RuntimeError):
+    """chat_stream() の応答が完了前に途切れた（受信済みの断片は返した後で送出）。"""
+
+
+def _iter_deltas(stream: Any, cache_key: Optional[str]) -> Iterator[str]:
+    """
+    ストリームの差分テキストを順に返す。
+    途中の例外や finish_reason が届かないまま終わった場合は、受信済み分を返した後に
+    StreamInterrupted を送出する（途中までの応答を完了した応答と区別できるように。キャッシュもしない）。
     """
+    pieces: List[str] = []
+    finished = False
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            piece = choice.delta.content
+            if piece:
+                pieces.append(piece)
+                yield piece
+            if choice.finish_reason is not None:
+                finished = True
+    except Exception as e:
+        raise StreamInterrupted(str(e) or type(e).__name__) from e
+    if not finished:
+        raise StreamInterrupted("stream ended without finish_reason")
+    if cache_key is not None and pieces:
+        _cache_set(cache_key, "".join(pieces).strip())
+
+
+def chat_stream(messages: List[Dict[str, Any]], model: Optional[str] = None) -> Optional[Iterator[str]]:
+    """
+    chat() のストリーミング版。届いたトークンから順に返すイテレータを返す。
+    - 接続できない（キー未設定・SDK 未導入・開始時の例外）場合は None（UI 側でフォールバック）
+    - 応答キャッシュが有効ならヒット時は応答全体を 1 要素で返す
+    - user の発話が空（空白のみ）なら API を呼ばずに None
+    """
+    if not _has_user_content(messages):
+        return None
     client, api_key = _make_client()
     if client is None or not api_key:
         return None
 
     mdl = model or get_model_name()
+
+    key: Optional[str] = None
+    if _cache_enabled(TEMPERATURE):
+        key = _cache_key(mdl, messages, TEMPERATURE)
+        cached = _cache_get(key)
+        if cached is not None:
+            return iter((cached,))
+
+    try:
+        stream = _create_with_retry(client, mdl, messages, stream=True)
+    except Exception:
+        return None
+    return _iter_deltas(stream, key)
+
+
+def embed(text: str, model: Optional[str] = None) -> Optional[List[float]]:
+    """
+    Embeddings API でテキストをベクトル化する。
+    - model: 未指定なら EMBED_MODEL（text-embedding-3-small）
+    - キー未設定や例外時は None を返す
+    """
+    client, api_key = _make_client()
+    if client is None or not api_key:
+        return None
+    try:
+        resp = client.embeddings.create(  # type: ignore[reportUnknownMemberType]
+            model=model or EMBED_MODEL,
+            input=text,
+        )
+        return list(resp.data[0].embedding)
+    except Exception:
+        return None
+
+
+# -----------------------------
+# 並行バッチ
+# -----------------------------
+async def _chat_one(
+    client: Any,
+    messages: List[Dict[str, Any]],
+    model: str,
+    sem: asyncio.Semaphore,
+    max_attempts: int = _RETRY_MAX_ATTEMPTS,
+    max_backoff_sec: float = _RETRY_MAX_SEC,
+) -> Optional[str]:
+    """
+    1 会話分を同時実行数の枠内で呼ぶ。一時的な失敗のみ再試行し、それ以外は None。
+    再試行の回数・待ちの上限は既定が chat_batch() 用。achat() は chat() 用の値を渡す。
+    """
+    async with sem:
+        for attempt in range(max_attempts):
+            try:
+                resp = await client.chat.completions.create(  # type: ignore[reportUnknownMemberType]
+                    model=model,
+                    messages=messages,  # type: ignore[arg-type]
+                    **_DEFAULT_PARAMS,
+                )
+                return (resp.choices[0].message.content or "").strip()
+            except Exception as e:
+                if not _is_retryable(e) or attempt + 1 >= max_attempts:
+                    return None
+                await asyncio.sleep(_backoff_delay(attempt, max_backoff_sec))
+    return None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """デーモンスレッドで回し続けるイベントループ（初回呼び出し時に起動）。"""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="speakstudio-async", daemon=True).start()
+            _LOOP = loop
+        return _LOOP
+
+
+def _run_coro(coro: Any, timeout: float = _BATCH_TIMEOUT_SEC) -> Any:
+    """
+    コルーチンを常駐ループで実行し、結果を同期的に待つ。
+    timeout を超えたらループ側のタスクも取り消す（取り残されたリクエストが枠を占有しないように）。
+    """
+    fut = asyncio.run_coroutine_threadsafe(coro, _get_loop())
     try:
-        # Pylance/pyright 向けに期待型へキャスト（実行時には無害）
-        messages_typed = cast("Iterable[ChatCompletionMessageParam]", messages)
+        return fut.result(timeout=timeout)
+    except BaseException:
+        fut.cancel()
+        raise
 
-        resp = client.chat.completions.create(  # type: ignore[reportUnknownMemberType]
-            model=mdl,
-            messages=messages_typed,
-            temperature=0.7,
+
+def _get_async_client(api_key: str) -> Any:
+    """
+    AsyncOpenAI を API キーごとに使い回す（常駐ループ上のコルーチンからのみ呼ぶこと）。
+    httpx.AsyncClient の接続がループに紐づくため、ループを作り直さない限り keep-alive が効く。
+    """
+    global _ASYNC_CLIENT, _ASYNC_CLIENT_KEY
+    if _ASYNC_CLIENT is not None and _ASYNC_CLIENT_KEY == api_key:
+        return _ASYNC_CLIENT
+    if _ASYNC_CLIENT is not None:
+        # キーが変わった: 古いクライアントの接続プールを常駐ループ上で閉じる（放置すると接続が漏れる）
+        task = asyncio.get_running_loop().create_task(_ASYNC_CLIENT.close())
+        _CLOSING_TASKS.add(task)
+        task.add_done_callback(_CLOSING_TASKS.discard)
+    kwargs: Dict[str, Any] = {"api_key": api_key, "max_retries": 0}
+    if httpx is not None:
+        try:
+            kwargs["http_client"] = httpx.AsyncClient(limits=httpx.Limits(max_connections=32))  # type: ignore[attr-defined]
+        except Exception:
+            pass
+    _ASYNC_CLIENT = AsyncOpenAI(**kwargs)  # type: ignore[misc]
+    _ASYNC_CLIENT_KEY = api_key
+    return _ASYNC_CLIENT
+
+
+async def _gather(
+    api_key: str,
+    batch: List[List[Dict[str, Any]]],
+    model: str,
+    max_concurrency: int,
+) -> List[Optional[str]]:
+    client = _get_async_client(api_key)
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+    return list(await asyncio.gather(*(_chat_one(client, msgs, model, sem) for msgs in batch)))
+
+
+async def achat(messages: List[Dict[str, Any]], model: Optional[str] = None) -> Optional[str]:
+    """
+    chat() の非同期版。どのイベントループから await してもよい。
+    通信は常駐ループ上の共有 AsyncOpenAI で行うため、呼び出し側のループが変わっても接続プールを使い回せる。
+    キャッシュ・再試行（回数 _CHAT_MAX_ATTEMPTS・待ちの上限 _CHAT_RETRY_MAX_SEC）・失敗時 None の扱いは chat() と同じ。
+    """
+    if not _has_user_content(messages):
+        return None
+    api_key = get_openai_api_key()
+    if not api_key or AsyncOpenAI is None:
+        return None
+
+    mdl = model or get_model_name()
+
+    key: Optional[str] = None
+    if _cache_enabled(TEMPERATURE):
+        key = _cache_key(mdl, messages, TEMPERATURE)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
+    async def _on_loop() -> Optional[str]:
+        return await _chat_one(
+            _get_async_client(api_key),
+            messages,
+            mdl,
+            asyncio.Semaphore(1),
+            max_attempts=_CHAT_MAX_ATTEMPTS,
+            max_backoff_sec=_CHAT_RETRY_MAX_SEC,
         )
-        return (resp.choices[0].message.content or "").strip()
+
+    try:
+        text = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_on_loop(), _get_loop()))
     except Exception:
         return None
+
+    if key is not None and text:
+        _cache_set(key, text)
+    return text
+
+
+def chat_batch(
+    batch: List[List[Dict[str, Any]]],
+    model: Optional[str] = None,
+    max_concurrency: int = 8,
+) -> List[Optional[str]]:
+    """
+    複数の会話（messages のリスト）を並行に投げ、入力と同じ順序で応答を返す。
+    - max_concurrency: 同時リクエスト数の上限
+    - 個々の失敗は None。キー未設定や SDK 未導入なら全要素 None
+    """
+    if not batch:
+        return []
+    api_key = get_openai_api_key()
+    if not api_key or AsyncOpenAI is None:
+        return [None] * len(batch)
+    try:
+        return _run_coro(_gather(api_key, batch, model or get_model_name(), max_concurrency))
+    except Exception:
+        return [None] * len(batch)
@@ -0,0 +1,72 @@
+# counter.py
+# -*- coding: utf-8 -*-
+"""
+累計アクセス数のカウンタ（SQLite: data/counter.db）。
+- 接続はプロセスで 1 本を共有し、テーブル作成などの初期化も初回接続時に 1 度だけ行う
+- 共有接続は複数セッション（スレッド）から使われるため、操作はロックで直列化する
+- Streamlit には依存しない（セッション単位で 1 度だけ数える制御は main.py 側）
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import sqlite3
+import threading
+
+__all__ = ["DB_PATH", "increment_page_views", "get_page_views"]
+
+DB_DIR = "data"
+DB_PATH = os.path.join(DB_DIR, "counter.db")
+_NAME = "page_views"
+
+_LOCK = threading.Lock()
+
+
+@functools.cache
+def _conn() -> sqlite3.Connection:
+    """カウンタ用 DB への接続（autocommit）。"""
+    os.makedirs(DB_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")  # WAL ではコミットごとの fsync を省いても壊れない（直近のカウントが失われ得るだけ）
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO counters(name, value) VALUES(?, ?);", (_NAME, 0))
+    return conn
+
+
+def increment_page_views() -> int:
+    """累計を 1 加算し、加算後の値を返す。"""
+    conn = _conn()
+    with _LOCK:
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            # 加算と読み出しを 1 文で（autocommit なので明示的なトランザクションは不要）
+            row = conn.execute(
+                "UPDATE counters SET value = value + 1 WHERE name = ? RETURNING value;", (_NAME,)
+            ).fetchone()
+        else:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = ?;", (_NAME,))
+                row = conn.execute("SELECT value FROM counters WHERE name = ?;", (_NAME,)).fetchone()
+                conn.commit()
+            except BaseException:
+                # 共有接続なので、開いたトランザクションを残すと以後の BEGIN がすべて失敗する
+                conn.rollback()
+                raise
+    return row[0] if row else 0
+
+
+def get_page_views() -> int:
+    """加算せずに現在の累計を返す。"""
+    conn = _conn()
+    with _LOCK:
+        row = conn.execute("SELECT value FROM counters WHERE name = ?;", (_NAME,)).fetchone()
+    return row[0] if row else 0
@@ -7,17 +7,36 @@
 - 任意モジュールの安全インポート
 - 文字起こし（SpeechRecognition があれば使用 / 言語: ko-KR）
 - 音声合成（gTTS→pyttsx3→テキスト不可の順でフォールバック / 言語: ko）
+- 再生用の MP3 バイト列（tts_stream / tts_bytes / tts_batch）と WAV バイト列の文字起こし（stt_from_wav_bytes）
+- 合成音声のディスクキャッシュ（同じ文・言語・エンジンは再合成しない）
+- 返答から TTS 対象（韓国語本文）を切り出す（extract_non_jp_for_tts）
+- 採点用テキスト正規化と採点（normalize_for_compare / similarity_score / diff_html）
+- ロールプレイ用 system プロンプトの組み立て（roleplay_system_prompt）
+- 会話履歴の型（Msg）と API 形式への変換・LLM に送る履歴の切り詰め（to_api / trim_history）
 
 ※ OpenAI 呼び出しは main.py 側の ss_api_client/api_client に委譲します。
 """
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import importlib
 import importlib.util
 import os
+import re
+import string
+import threading
+import unicodedata
+import io
 import uuid
-from typing import Optional, Tuple, Any
+import wave
+import zlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 # --- 安全に constants を読む（無くても動く） ---
 try:
@@ -29,15 +48,24 @@ except Exception:
 APP_NAME: str = getattr(ct, "APP_NAME", "SpeakStudio KR")
 AUDIO_OUTPUT_DIR: str = getattr(ct, "AUDIO_OUTPUT_DIR", "audio_outputs")
 VOICE_LANG: str = getattr(ct, "VOICE_LANG", "ko")  # gTTS の lang コード（KR版は 'ko'）
+TTS_CACHE_DIR: str = getattr(ct, "TTS_CACHE_DIR", os.path.join("data", "tts"))
+ROLEPLAY_SCENARIOS: Dict[str, str] = getattr(ct, "ROLEPLAY_SCENARIOS", {})
+ROLEPLAY_TONE_STYLES: Dict[str, str] = getattr(ct, "ROLEPLAY_TONE_STYLES", {})
+ROLEPLAY_COMMON_INSTRUCTIONS: str = getattr(ct, "ROLEPLAY_COMMON_INSTRUCTIONS", "")
 
 # -----------------------------
 # ファイル系
 # -----------------------------
+@functools.lru_cache(maxsize=8)
+def _ensure_dir(path: str) -> str:
+    """ディレクトリ作成はパスごとに 1 回だけ（以降は stat 無しで返す）。"""
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
 def ensure_audio_dir(path: Optional[str] = None) -> str:
     """音声ファイル保存ディレクトリを作成（存在しなければ作成）してパスを返す。"""
-    out = path or AUDIO_OUTPUT_DIR
-    os.makedirs(out, exist_ok=True)
-    return out
+    return _ensure_dir(path or AUDIO_OUTPUT_DIR)
 
 
 def save_uploaded_audio(file_bytes: bytes, suffix: str = ".wav") -> str:
@@ -45,16 +73,78 @@ def save_uploaded_audio(file_bytes: bytes, suffix: str = ".wav") -> str:
     out_dir = ensure_audio_dir()
     fname = f"input_{uuid.uuid4().hex}{suffix}"
     fpath = os.path.join(out_dir, fname)
-    with open(fpath, "wb") as f:
-        f.write(file_bytes)
+    Path(fpath).write_bytes(file_bytes)
     return fpath
 
 
+# -----------------------------
+# 合成音声のディスクキャッシュ
+# -----------------------------
+def _tts_key(text: str, lang: str, engine: str) -> str:
+    return hashlib.blake2b(f"{engine}|{lang}|{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _tts_cache_path(text: str, lang: str, engine: str = "gTTS", ext: str = ".mp3") -> str:
+    return os.path.join(_ensure_dir(TTS_CACHE_DIR), _tts_key(text, lang, engine) + ext)
+
+
+def tts_cache_get(text: str, lang: str, engine: str = "gTTS") -> Optional[bytes]:
+    """キャッシュ済みの音声バイト列を返す（無ければ None）。"""
+    try:
+        with open(_tts_cache_path(text, lang, engine), "rb") as f:
+            return f.read() or None
+    except Exception:
+        return None
+
+
+def tts_cache_put(text: str, lang: str, data: bytes, engine: str = "gTTS") -> None:
+    """音声バイト列を保存（一時ファイル → rename で、読み手に書きかけを見せない）。"""
+    if not data:
+        return
+    try:
+        path = _tts_cache_path(text, lang, engine)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+# -----------------------------
+# プロセス内の重複要求よけ（再実行の連打で同じ音声を何度も読まない）
+# -----------------------------
+# 整数キー → (識別子, 値)。キーは衝突し得るので識別子も突き合わせる。挿入順に古いものから捨てる
+_TTS_MEM: Dict[int, Tuple[Any, bytes]] = {}
+_STT_MEM: Dict[int, Tuple[Any, str]] = {}
+_TTS_MEM_MAX = 256
+_STT_MEM_MAX = 64
+_MEM_LOCK = threading.Lock()
+
+
+def _memo_get(store: Dict[int, Tuple[Any, Any]], key: int, ident: Any) -> Optional[Any]:
+    hit = store.get(key)
+    if hit is not None and hit[0] == ident:
+        return hit[1]
+    return None
+
+
+def _memo_put(store: Dict[int, Tuple[Any, Any]], key: int, ident: Any, value: Any, maxsize: int) -> None:
+    with _MEM_LOCK:
+        store[key] = (ident, value)
+        while len(store) > maxsize:
+            store.pop(next(iter(store)))
+
+
 # -----------------------------
 # 動的 import ヘルパ
 # -----------------------------
+@functools.lru_cache(maxsize=None)
 def _optional_import(module_name: str) -> Optional[Any]:
-    """存在すればモジュールを返し、無ければ None（例外を表に出さない）。"""
+    """
+    存在すればモジュールを返し、無ければ None（例外を表に出さない）。
+    find_spec は sys.path を走査して stat するため、結果はモジュール名ごとに覚えておく。
+    """
     try:
         spec = importlib.util.find_spec(module_name)
         if spec is None:
@@ -64,21 +154,65 @@ def _optional_import(module_name: str) -> Optional[Any]:
         return None
 
 
+# gTTS は起動直後のお手本音声の先読みで使うので import 時に解決する。
+# speech_recognition / pyttsx3 はシャドーイングやフォールバックでしか使わないため、
+# 初回使用時に _optional_import（結果はキャッシュ済み）で読み込む
+_GTTS = _optional_import("gtts")
+GTTS_OK: bool = _GTTS is not None
+
+
+def _sr() -> Optional[Any]:
+    return _optional_import("speech_recognition")
+
+
 # -----------------------------
 # 文字起こし
 # -----------------------------
-def transcribe_audio(audio_path: str) -> str:
+@functools.cache
+def get_recognizer() -> Optional[Any]:
+    """
+    共有の speech_recognition.Recognizer（初回呼び出し時に作成。未導入なら None）。
+    閾値を固定し、毎回の初期化を省く。
+    """
+    sr = _sr()
+    if sr is None:
+        return None
+    recognizer = sr.Recognizer()  # type: ignore[attr-defined]
+    recognizer.energy_threshold = 300
+    recognizer.dynamic_energy_threshold = False
+    return recognizer
+
+
+def load_audio_data(source: Any) -> Any:
+    """
+    WAV（パス or ファイルライク）を sr.AudioData にする。
+    モノラル 16/32bit PCM は wave で直接読み、それ以外（ステレオ・8bit 等）は
+    変換処理を持つ sr.AudioFile に任せる。
+    """
+    try:
+        with wave.open(source, "rb") as w:
+            if w.getnchannels() == 1 and w.getsampwidth() in (2, 4):
+                frames = w.readframes(w.getnframes())
+                return _sr().AudioData(frames, w.getframerate(), w.getsampwidth())  # type: ignore[union-attr]
+    except (wave.Error, EOFError):
+        pass
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with _sr().AudioFile(source) as src:  # type: ignore[union-attr]
+        return get_recognizer().record(src)  # type: ignore[union-attr]
+
+
+def transcribe_audio(audio_path: Union[str, BinaryIO]) -> str:
     """
     SpeechRecognition があれば韓国語で簡易文字起こし（Google Web Speech API）。
+    パスのほか io.BytesIO 等のファイルライクも受け付ける（保存せずにそのまま渡せる）。
     失敗時やライブラリ未導入時は空文字を返す。
     """
-    sr = _optional_import("speech_recognition")
-    if sr is None:
+    recognizer = get_recognizer()
+    if recognizer is None:
         return ""
     try:
-        recognizer = sr.Recognizer()  # type: ignore[attr-defined]
-        with sr.AudioFile(audio_path) as source:  # type: ignore[attr-defined]
-            audio = recognizer.record(source)  # type: ignore[attr-defined]
+        audio = load_audio_data(audio_path)
         try:
             text = recognizer.recognize_google(audio, language="ko-KR")  # type: ignore[attr-defined]
             return text
@@ -88,39 +222,300 @@ def transcribe_audio(audio_path: str) -> str:
         return ""
 
 
+def stt_from_wav_bytes(wav_bytes: bytes, language: str = "ko-KR") -> Tuple[bool, str]:
+    """WAV バイト列を SpeechRecognition で文字起こしする。(成否, テキストまたはエラー文) を返す。"""
+    recognizer = get_recognizer()
+    if recognizer is None:
+        return False, "SpeechRecognition が未インストールです。 pip install SpeechRecognition"
+    # 録音は同じ長さのものが多く crc32 だけでは取り違え得るので、識別子は音声全体の blake2b にする
+    digest = hashlib.blake2b(wav_bytes, digest_size=16).digest()
+    key, ident = int.from_bytes(digest[:8], "little"), (digest, language)
+    cached = _memo_get(_STT_MEM, key, ident)
+    if cached is not None:
+        return True, cached
+    try:
+        audio = load_audio_data(io.BytesIO(wav_bytes))
+        text = recognizer.recognize_google(audio, language=language)  # type: ignore[union-attr]
+        _memo_put(_STT_MEM, key, ident, text, _STT_MEM_MAX)
+        return True, text
+    except Exception as e:
+        return False, f"音声の解析に失敗しました: {e}"
+
+
 # -----------------------------
 # 音声合成（gTTS→pyttsx3→不可）
 # -----------------------------
+def _nonempty_file(path: str) -> bool:
+    """既存の合成結果として使えるか（0 バイトのファイルは失敗の残骸とみなす）。"""
+    try:
+        return os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+
+def _write_atomic(path: str, write: Any) -> bool:
+    """
+    write(一時ファイルのパス) で同じディレクトリの一時ファイルに書かせ、成功したら path へ os.replace する。
+    失敗・0 バイトなら一時ファイルを消して False（path に書きかけを残さない・読み手に見せない）。
+    """
+    root, ext = os.path.splitext(path)
+    tmp = f"{root}.{uuid.uuid4().hex}.tmp{ext}"  # 拡張子で形式を決めるエンジンのため末尾は元の拡張子
+    try:
+        write(tmp)
+        if not _nonempty_file(tmp):
+            raise OSError("empty output")
+        os.replace(tmp, path)
+        return True
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
 def synthesize_speech(text: str, lang: Optional[str] = None) -> Tuple[Optional[str], str]:
     """
     指定テキストを音声ファイルにし、(音声ファイルパス, 使用エンジン) を返す。
-    失敗時は (None, reason) を返す。
+    失敗時や空文字（空白のみ）の時は (None, reason) を返す。前後の空白は除いてからキャッシュを引く。
     優先: gTTS(mp3, lang=ko) → pyttsx3(wav) → unavailable
     """
+    text = text.strip()
+    if not text:
+        return None, "empty"
     lang = lang or VOICE_LANG
     out_dir = ensure_audio_dir()
 
-    # 1) gTTS（mp3）
-    gtts = _optional_import("gtts")
+    # 1) gTTS（mp3）: 同じ (text, lang) なら前回のファイルをそのまま返す
+    mp3_path = os.path.join(out_dir, f"tts_{_tts_key(text, lang, 'gTTS')}.mp3")
+    if _nonempty_file(mp3_path):
+        return mp3_path, "gTTS"
+    gtts = _GTTS
     if gtts is not None:
-        try:
-            mp3_path = os.path.join(out_dir, f"tts_{uuid.uuid4().hex}.mp3")
-            gtts.gTTS(text=text, lang=lang).save(mp3_path)  # type: ignore[attr-defined]
+        def _save_mp3(tmp: str) -> None:
+            gtts.gTTS(text=text, lang=lang).save(tmp)  # type: ignore[attr-defined]
+
+        if _write_atomic(mp3_path, _save_mp3):
             return mp3_path, "gTTS"
-        except Exception:
-            pass
 
     # 2) pyttsx3（wav）
+    wav_path = os.path.join(out_dir, f"tts_{_tts_key(text, lang, 'pyttsx3')}.wav")
+    if _nonempty_file(wav_path):
+        return wav_path, "pyttsx3"
     pyttsx3 = _optional_import("pyttsx3")
     if pyttsx3 is not None:
-        try:
+        def _save_wav(tmp: str) -> None:
             engine = pyttsx3.init()  # type: ignore[attr-defined]
-            wav_path = os.path.join(out_dir, f"tts_{uuid.uuid4().hex}.wav")
-            engine.save_to_file(text, wav_path)  # type: ignore[attr-defined]
+            engine.save_to_file(text, tmp)  # type: ignore[attr-defined]
             engine.runAndWait()  # type: ignore[attr-defined]
+
+        if _write_atomic(wav_path, _save_wav):
             return wav_path, "pyttsx3"
-        except Exception:
-            pass
 
     # 3) フォールバック（音声生成不可）
     return None, "unavailable"
+
+
+# -----------------------------
+# 音声合成（バイト列。UI での再生用）
+# -----------------------------
+def tts_stream(text: str, lang: str = "ko") -> Iterator[bytes]:
+    """gTTS がテキストの断片（約 100 文字）を合成するたびに MP3 チャンクを返す。"""
+    if not GTTS_OK:
+        return
+    yield from _GTTS.gTTS(text=text, lang=lang).stream()  # type: ignore[union-attr]
+
+
+def tts_bytes(text: str, lang: str = "ko") -> Optional[bytes]:
+    """MP3 バイト列を返す（ディスクキャッシュ優先、無ければ gTTS）。失敗時・空文字のときは None。"""
+    text = text.strip()
+    if not text:
+        return None
+    key, ident = zlib.crc32(f"{lang}|{text}".encode("utf-8")), (lang, text)
+    cached = _memo_get(_TTS_MEM, key, ident)
+    if cached is not None:
+        return cached
+    cached = tts_cache_get(text, lang)
+    if cached is not None:
+        _memo_put(_TTS_MEM, key, ident, cached, _TTS_MEM_MAX)
+        return cached
+    if not GTTS_OK:
+        return None
+    try:
+        data = b"".join(tts_stream(text, lang))
+    except Exception:
+        return None
+    if not data:
+        return None
+    tts_cache_put(text, lang, data)
+    _memo_put(_TTS_MEM, key, ident, data, _TTS_MEM_MAX)
+    return data
+
+
+def tts_batch(texts: List[str], lang: str = "ko", max_workers: int = 4) -> List[Optional[bytes]]:
+    """
+    複数テキストをまとめて合成（gTTS は同期 HTTP なのでスレッドで並列化）。
+    結果は tts_bytes() 経由でディスクキャッシュにも入る。同時接続は max_workers 本に抑える。
+    """
+    if not texts:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts") as pool:
+        return list(pool.map(lambda t: tts_bytes(t, lang), texts))
+
+
+# -----------------------------
+# TTS 対象の切り出し
+# -----------------------------
+# 返答末尾の日本語要約行（行頭の "JP:" / "JP："）と、行頭以外に現れる "JP:"
+JP_LINE_RE = re.compile(r"^\s*jp\s*[:：]", re.IGNORECASE | re.MULTILINE)
+_JP_INLINE_RE = re.compile(r"\bjp\s*[:：]", re.IGNORECASE)
+
+
+def extract_non_jp_for_tts(full_text: str, max_len: int = 600) -> str:
+    """
+    返答文から日本語の要約行（JP:／JP：以降）を除外して、
+    先頭（=韓国語本文）だけをTTS対象にする。全角コロンにも対応。
+    """
+    if not full_text:
+        return ""
+    # 大半の返答は「本文\nJP: ...」の形なので、まず C 実装の partition で切る。
+    # 手前に別の jp が無いときだけ採用（あれば従来どおり正規表現で最初の JP 行を探す）
+    head, sep, _ = full_text.partition("\nJP:")
+    if sep and "jp" not in head.lower():
+        return (head.strip() or full_text.strip())[:max_len]
+    m = JP_LINE_RE.search(full_text)
+    cut = m.start() if m else None
+    if cut is None:
+        m2 = _JP_INLINE_RE.search(full_text)
+        cut = m2.start() if m2 else len(full_text)
+    head = (full_text[:cut].strip() or full_text.strip())
+    return head[:max_len]
+
+
+# -----------------------------
+# 採点用の正規化
+# -----------------------------
+_ASCII_PUNCT_TABLE = str.maketrans({c: " " for c in string.punctuation})
+
+
+def _ascii_normalize(s: str) -> str:
+    """ASCII のみの文字列用: 記号を空白へ置換 → 小文字化 → 空白を 1 つに（C 実装の str メソッドのみ）。"""
+    return " ".join(s.translate(_ASCII_PUNCT_TABLE).lower().split())
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_for_compare(s: str) -> str:
+    """
+    お手本と認識結果を比べるための正規化（NFC → 小文字化 → 記号除去 → 空白を 1 つに）。
+    お手本は固定の約 90 文なので、結果はキャッシュして使い回す。
+    正規表現は使わず、1 回の走査で「文字は残す / 空白・記号は区切り 1 つに畳む」を行う。
+    """
+    if s.isascii():
+        return _ascii_normalize(s)
+    # 既に NFC（合成済みハングル等、大半の入力）なら再構成をスキップ
+    if not unicodedata.is_normalized("NFC", s):
+        s = unicodedata.normalize("NFC", s)
+    out: List[str] = []
+    prev_sep = True  # 先頭の区切りは出さない
+    for ch in s:
+        if ch.isalnum():
+            out.append(ch)
+            prev_sep = False
+        elif not prev_sep:
+            out.append(" ")
+            prev_sep = True
+    return "".join(out).rstrip().lower()
+
+
+# -----------------------------
+# 採点（類似度 / 単語単位の差分。rapidfuzz があれば C++ 実装、無ければ difflib）
+# -----------------------------
+try:
+    from rapidfuzz.distance import Indel, Levenshtein  # type: ignore
+    RAPIDFUZZ_OK = True
+except Exception:
+    Indel = Levenshtein = None  # type: ignore
+    RAPIDFUZZ_OK = False
+
+
+@functools.lru_cache(maxsize=512)
+def similarity_score(ref: str, hyp: str, ref_normalized: bool = False) -> float:
+    """お手本と認識結果の類似度（0〜1）。ref_normalized=True なら ref は正規化済み（NORMALIZED_REFS の値）として扱う。"""
+    a = ref if ref_normalized else normalize_for_compare(ref)
+    b = normalize_for_compare(hyp)
+    if RAPIDFUZZ_OK:
+        return Indel.normalized_similarity(a, b)  # type: ignore[union-attr]
+    return SequenceMatcher(None, a, b).ratio()
+
+
+_DEL_FMT = "<span class='del'>{}</span>"
+_ADD_FMT = "<span class='add'>{}</span>"
+
+
+def _word_opcodes(ref_tokens: List[str], hyp_tokens: List[str]) -> Iterator[Tuple[str, int, int, int, int]]:
+    """(tag, i1, i2, j1, j2) を返す。rapidfuzz があれば Levenshtein.opcodes、なければ SequenceMatcher。"""
+    if RAPIDFUZZ_OK:
+        for op in Levenshtein.opcodes(ref_tokens, hyp_tokens):  # type: ignore[union-attr]
+            yield op.tag, op.src_start, op.src_end, op.dest_start, op.dest_end
+    else:
+        yield from SequenceMatcher(None, ref_tokens, hyp_tokens, autojunk=False).get_opcodes()
+
+
+def diff_html(ref: str, hyp: str) -> str:
+    """お手本 → 認識結果の単語差分を HTML で返す（削除は .del、追加は .add）。"""
+    ref_tokens, hyp_tokens = ref.split(), hyp.split()
+    out: List[str] = []
+    # 一致区間はそのまま、それ以外は削除 → 追加の順で出す（replace もこの順）
+    for tag, i1, i2, j1, j2 in _word_opcodes(ref_tokens, hyp_tokens):
+        if tag == "equal":
+            out.extend(ref_tokens[i1:i2])
+            continue
+        out.extend(_DEL_FMT.format(t) for t in ref_tokens[i1:i2])
+        out.extend(_ADD_FMT.format(t) for t in hyp_tokens[j1:j2])
+    return " ".join(out)
+
+
+# -----------------------------
+# プロンプト
+# -----------------------------
+@functools.cache
+def roleplay_system_prompt(scenario: str, tone: str) -> str:
+    """
+    ロールプレイの system プロンプトを組み立てる。
+    組み合わせは (シナリオ数 × 口調数) しかないので、一度作った文字列を使い回す。
+    """
+    return (
+        ROLEPLAY_SCENARIOS.get(scenario, "")
+        + " " + ROLEPLAY_TONE_STYLES.get(tone, "")
+        + " " + ROLEPLAY_COMMON_INSTRUCTIONS
+    )
+
+
+# -----------------------------
+# 会話履歴
+# -----------------------------
+@dataclass(frozen=True, slots=True)
+class Msg:
+    """会話履歴の 1 発言（セッションに保持する形。API に送る直前に to_api() で dict にする）。"""
+    role: str
+    content: str
+
+
+def to_api(messages: Iterable[Msg]) -> List[Dict[str, str]]:
+    """Msg の列を OpenAI Chat Completions の messages 形式にする。"""
+    return [{"role": m.role, "content": m.content} for m in messages]
+
+
+def trim_history(messages: List[Msg], keep: int = 12) -> List[Msg]:
+    """
+    LLM に送る履歴を「先頭の system + 直近 keep 件」に絞る（画面表示用の履歴はそのまま）。
+    会話が伸びても 1 回あたりのプロンプト長が一定に収まる。
+    切り出しは user 発話から始める（先頭が前の往復の assistant 応答だけになるのを避ける）。
+    """
+    if len(messages) <= keep + 1:
+        return messages
+    head = messages[:1] if messages and messages[0].role == "system" else []
+    tail = messages[-keep:]
+    if len(tail) > 1 and tail[0].role == "assistant":
+        tail = tail[1:]
+    return head + tail
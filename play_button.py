@@ -0,0 +1,36 @@
+# play_button.py
+# -*- coding: utf-8 -*-
+"""
+WebAudio の再生ボタン（モバイルでも確実に鳴り、音量ブーストもできる）。
+- frontend/play_button/index.html を Streamlit のカスタムコンポーネントとして 1 度だけ登録する
+- MP3 はバイト列のまま引数で渡す（base64 にして HTML へ埋め込まない）。
+  HTML/JS は iframe に 1 度読み込まれ、再実行では引数だけが届く
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Optional
+
+import streamlit.components.v1 as components
+
+__all__ = ["play_button"]
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "play_button")
+_component = components.declare_component("play_button", path=_FRONTEND_DIR)
+
+
+def play_button(mp3: bytes, label: str = "🔊 再生", boost: float = 1.0, key: Optional[str] = None) -> None:
+    """
+    MP3 を再生するボタンを置く。
+    digest は音声の同一性の判定用（変わったときだけフロント側でデコードし直す）。
+    """
+    _component(
+        mp3=mp3,
+        digest=hashlib.blake2b(mp3, digest_size=8).hexdigest(),
+        label=label,
+        boost=boost,
+        key=key,
+        default=None,
+    )
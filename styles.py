@@ -0,0 +1,96 @@
+# styles.py
+# -*- coding: utf-8 -*-
+"""
+画面用の CSS と HTML 断片（固定文字列）。
+main.py は Streamlit の再実行ごとに上から実行し直されるため、文字列の組み立ては
+このモジュールの import 時に 1 度だけ行う。件数などの可変部分は main.py 側で後ろに足す。
+"""
+
+__all__ = [
+    "CSS_BLOCK",
+    "FOOTER_COUNTER_CSS",
+    "FOOTER_COUNTER_FIXED_CSS",
+    "MIC_WARN_HTML",
+    "NOTE_FMT",
+    "PILL_FMT",
+    "RP_NOTE_HTML",
+    "STREAM_CUT_HTML",
+    "TTS_FAIL_HTML",
+    "TTS_PENDING_HTML",
+]
+
+# 全画面共通のスタイル（ノート・警告・差分表示・ID ピル）
+CSS_BLOCK = "\n".join(
+    [
+        "<style>",
+        ".note {"
+        "  background:#e9f1ff;"
+        "  border:1px solid #bcd3ff;"
+        "  border-radius:10px;"
+        "  padding:10px 12px;"
+        "  margin:8px 0;"
+        "  color:#111;"
+        "}",
+        '[data-theme="dark"] .note {'
+        "  background:#0f172a;"
+        "  border-color:#334155;"
+        "  color:#e5e7eb;"
+        "}",
+        ".warn {background:#fff1ec;border:1px solid #ffc7b5;border-radius:10px;padding:10px 12px;margin:8px 0;}",
+        ".good {background:#ecfff1;border:1px solid #b9f5c9;border-radius:10px;padding:10px 12px;margin:8px 0;}",
+        ".add {background:#e7ffe7;border:1px solid #b8f5b8;border-radius:6px;padding:1px 4px;margin:0 1px;}",
+        ".del {background:#ffecec;border:1px solid #ffc5c5;border-radius:6px;padding:1px 4px;margin:0 1px;text-decoration:line-through;}",
+        ".idpill {display:inline-block;background:#222;color:#fff;border-radius:8px;padding:2px 8px;font-size:12px;margin-right:6px;}",
+        ".stMarkdown, .stMarkdown * { -webkit-text-fill-color: inherit !important; }",
+        "</style>",
+    ]
+)
+
+# フッターのアクセスカウンター（通常位置）
+FOOTER_COUNTER_CSS = """
+<style>
+.footer-counter {
+    color: #9aa0a6;
+    font-size: 12px;
+    text-align: center;
+    margin-top: 32px;
+    opacity: 0.9;
+}
+</style>
+"""
+
+# フッターのアクセスカウンター（チャット入力欄の下に固定）
+FOOTER_COUNTER_FIXED_CSS = """
+<style>
+  [data-testid="stChatInput"] { margin-bottom: 28px; }
+  .footer-counter-fixed {
+    position: fixed;
+    left: 0; right: 0;
+    bottom: 6px;
+    text-align: center;
+    color: #9aa0a6;
+    font-size: 12px;
+    opacity: 0.9;
+    pointer-events: none;
+    z-index: 999;
+  }
+</style>
+"""
+
+# 固定の案内・警告
+MIC_WARN_HTML = (
+    "<div class='warn'>`streamlit-mic-recorder` が未インストールのため、マイク録音は使用できません。"
+    "下の『WAV をアップロード』を利用してください。<br>インストール: "
+    "<code>pip install streamlit-mic-recorder</code></div>"
+)
+RP_NOTE_HTML = (
+    "<div class='note'>相手役（AI）と韓国語で会話します。最後に短い質問を付け、"
+    "JP: で日本語要約も付きます。</div>"
+)
+TTS_FAIL_HTML = "<div class='warn'>音声の生成に失敗しました。</div>"
+TTS_PENDING_HTML = "<div class='note'>音声の生成に時間がかかっているため、再生ボタンは省略しました。</div>"
+STREAM_CUT_HTML = "<div class='warn'>通信が途切れたため、返答が途中までになっている可能性があります。</div>"
+
+# 可変部分だけを差し込む書式（str.format）
+PILL_FMT = "<span class='idpill'>{id}</span> **{text}**"  # 文例 ID と本文
+NOTE_FMT = "<div class='note'>{}</div>"                   # 差分表示の枠
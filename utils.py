@@ -11,6 +11,7 @@ OPENAI_API_KEY / OPENAI_MODEL を安全に取得するユーティリティ
 
 from __future__ import annotations
 
+import functools
 import os
 from pathlib import Path
 
@@ -20,6 +21,12 @@ try:
 except Exception:
     st = None  # type: ignore
 
+# 既定モデル名は constants.py に一本化（無くても動く）
+try:
+    from constants import OPENAI_MODEL as DEFAULT_MODEL  # type: ignore
+except Exception:
+    DEFAULT_MODEL = "gpt-4o-mini"
+
 
 def _secrets_file_exists() -> bool:
     """典型パスに secrets.toml があるかの事前チェック。"""
@@ -31,8 +38,12 @@ def _secrets_file_exists() -> bool:
     return any(p.is_file() for p in candidates)
 
 
+@functools.cache
 def _load_dotenv_silent() -> None:
-    """python-dotenv があれば静かに読み込む（未導入でも例外にしない）。"""
+    """
+    python-dotenv があれば静かに読み込む（未導入でも例外にしない）。
+    override=False で環境変数へ反映するだけなので、.env の読み込みはプロセスで 1 回で足りる。
+    """
     try:
         from dotenv import load_dotenv  # type: ignore
         load_dotenv(override=False)
@@ -40,52 +51,44 @@ def _load_dotenv_silent() -> None:
         pass
 
 
-def get_openai_api_key() -> str | None:
+def _get_setting(name: str) -> str | None:
     """
-    OPENAI_API_KEY を返す（見つからなければ None）。
-    優先度: .env/環境変数 -> st.secrets(条件付き)
+    設定値を返す（見つからなければ None）。
+    優先度: .env/環境変数 -> st.secrets(USE_ST_SECRETS=1 または secrets.toml 実在時のみ)
     """
     # 1) .env / 環境変数
     _load_dotenv_silent()
-    key = os.getenv("OPENAI_API_KEY")
-    if key:
-        os.environ["OPENAI_API_KEY"] = key
-        return key
+    value = os.getenv(name)
+    if value:
+        return value
 
     # 2) st.secrets（USE_ST_SECRETS=1 または secrets.toml 実在時のみ）
     use_st = os.getenv("USE_ST_SECRETS") == "1"
     if st is not None and (use_st or _secrets_file_exists()):
         try:
-            key = st.secrets.get("OPENAI_API_KEY", None)  # type: ignore[attr-defined]
+            value = st.secrets.get(name, None)  # type: ignore[attr-defined]
         except Exception:
-            key = None
-        if key:
-            os.environ["OPENAI_API_KEY"] = key
-            return key
+            value = None
+        if value:
+            return value
 
     return None
 
 
-def get_model_name(default: str = "gpt-4o-mini") -> str:
+def get_openai_api_key() -> str | None:
     """
-    OPENAI_MODEL を返す。見つからなければ default を返す。
-    優先度: .env/環境変数 -> st.secrets(条件付き) -> 既定値
+    OPENAI_API_KEY を返す（見つからなければ None）。
+    優先度: .env/環境変数 -> st.secrets(条件付き)
     """
-    # 1) .env / 環境変数
-    _load_dotenv_silent()
-    name = os.getenv("OPENAI_MODEL")
-    if name:
-        return name
+    key = _get_setting("OPENAI_API_KEY")
+    if key:
+        os.environ["OPENAI_API_KEY"] = key
+    return key
 
-    # 2) st.secrets（USE_ST_SECRETS=1 または secrets.toml 実在時のみ）
-    use_st = os.getenv("USE_ST_SECRETS") == "1"
-    if st is not None and (use_st or _secrets_file_exists()):
-        try:
-            name = st.secrets.get("OPENAI_MODEL", None)  # type: ignore[attr-defined]
-        except Exception:
-            name = None
-        if name:
-            return name
 
-    # 3) 既定値
-    return default
+def get_model_name(default: str = DEFAULT_MODEL) -> str:
+    """
+    OPENAI_MODEL を返す。見つからなければ default を返す。
+    優先度: .env/環境変数 -> st.secrets(条件付き) -> 既定値（constants.OPENAI_MODEL）
+    """
+    return _get_setting("OPENAI_MODEL") or default